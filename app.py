@@ -1,293 +1,280 @@
-import math
 import re
-import textwrap
+import unicodedata
+from collections import Counter
 from datetime import datetime
-from io import BytesIO
+from io import BytesIO, StringIO
 
-import matplotlib.pyplot as plt
-import pdfplumber
+import ahocorasick
+import numpy as np
 import streamlit as st
-from docx import Document
+
+# pdfplumber/pypdfium2 e python-docx são pesados no import e só entram em
+# cena quando o usuário usa a seção correspondente; cada função os importa
+# na primeira chamada (depois disso o sys.modules resolve de graça).
 
 # =============== CONFIGURAÇÃO DAS PERGUNTAS ===============
 
 QUESTIONS = {
-"Caráter": [
-{"id": "caracter_hist_atrasos_desc", "type": "text",
-"text": "Descreva, com sinceridade, o histórico da empresa em relação a atrasos com bancos, fornecedores e impostos nos últimos 24 meses."},
-{"id": "caracter_hist_atrasos_nota", "type": "scale",
-"text": "De 0 a 10, qual nota você daria para o cumprimento de prazos de pagamento da empresa? (0 = péssimo, 10 = sempre em dia)"},
-{"id": "caracter_restricoes_desc", "type": "text",
-"text": "Existem protestos, apontamentos em Serasa/Cartórios ou restrições em nome da empresa ou dos sócios? Descreva."},
-{"id": "caracter_restricoes_nota", "type": "scale",
-"text": "De 0 a 10, quão limpa você considera a situação cadastral da empresa e dos sócios? (0 = muito suja, 10 = totalmente limpa)"},
-{"id": "caracter_reputacao_desc", "type": "text",
-"text": "Como você descreveria a reputação da empresa junto a fornecedores, clientes e parceiros?"},
-{"id": "caracter_reputacao_nota", "type": "scale",
-"text": "De 0 a 10, qual nota você daria para a reputação da empresa no mercado?"},
-],
-"Capacidade": [
-{"id": "capacidade_fluxo_desc", "type": "text",
-"text": "Descreva como está hoje o fluxo de caixa da empresa (entradas, saídas, aperto em determinados períodos etc.)."},
-{"id": "capacidade_fluxo_nota", "type": "scale",
-"text": "De 0 a 10, qual nota você daria para a capacidade atual da empresa de gerar caixa para pagar dívidas?"},
-{"id": "capacidade_faturamento_desc", "type": "text",
-"text": "Explique como está o faturamento dos últimos 12 meses (crescendo, caindo, estável)."},
-{"id": "capacidade_faturamento_nota", "type": "scale",
-"text": "De 0 a 10, quão confortável você está com o nível atual de faturamento para suportar novas dívidas?"},
-{"id": "capacidade_endividamento_desc", "type": "text",
-"text": "Descreva o nível de endividamento atual (bancos, factorings, fornecedores, impostos)."},
-{"id": "capacidade_endividamento_nota", "type": "scale",
-"text": "De 0 a 10, considerando tudo, qual nota você daria para a capacidade da empresa de assumir mais crédito sem se complicar?"},
-],
-"Capital": [
-{"id": "capital_estrutura_desc", "type": "text",
-"text": "Descreva a estrutura financeira da empresa: possui reservas, capital próprio, patrimônio, bens em nome da empresa?"},
-{"id": "capital_reservas_nota", "type": "scale",
-"text": "De 0 a 10, qual nota você daria para o nível de reserva financeira e capital próprio da empresa?"},
-{"id": "capital_patrimonio_desc", "type": "text",
-"text": "Quais são os principais bens e ativos relevantes em nome da empresa (imóveis, máquinas, veículos etc.)?"},
-{"id": "capital_patrimonio_nota", "type": "scale",
-"text": "De 0 a 10, quão robusto você considera o patrimônio da empresa em relação ao tamanho do negócio?"},
-{"id": "capital_resiliencia_desc", "type": "text",
-"text": "Como a empresa costuma reagir a crises (perda de clientes, queda de faturamento, aumento de custo)?"},
-{"id": "capital_resiliencia_nota", "type": "scale",
-"text": "De 0 a 10, qual a capacidade da empresa de suportar períodos difíceis sem deixar de pagar suas obrigações?"},
-],
-"Colateral": [
-{"id": "colateral_bens_desc", "type": "text",
-"text": "Que garantias a empresa poderia oferecer em uma operação de crédito (imóveis, veículos, máquinas, recebíveis)?"},
-{"id": "colateral_bens_nota", "type": "scale",
-"text": "De 0 a 10, quão fortes e líquidos você considera esses bens como garantia?"},
-{"id": "colateral_recebiveis_desc", "type": "text",
-"text": "A empresa possui carteira de recebíveis (duplicatas, boletos, cartões, contratos) que poderia ser usada como garantia? Descreva."},
-{"id": "colateral_recebiveis_nota", "type": "scale",
-"text": "De 0 a 10, qual a qualidade desses recebíveis (prazo, risco de inadimplência, concentração em poucos clientes)?"},
-{"id": "colateral_avales_desc", "type": "text",
-"text": "Os sócios estariam dispostos a dar garantias pessoais (aval, fiança) se necessário? Descreva."},
-{"id": "colateral_avales_nota", "type": "scale",
-"text": "De 0 a 10, quão confortável você considera a estrutura de garantias que a empresa conseguiria montar hoje?"},
-],
-"Condições": [
-{"id": "condicoes_setor_desc", "type": "text",
-"text": "Descreva como está o momento do setor em que a empresa atua (expansão, crise, concorrência forte etc.)."},
-{"id": "condicoes_setor_nota", "type": "scale",
-"text": "De 0 a 10, quão favoráveis são as condições do setor para a empresa hoje?"},
-{"id": "condicoes_economia_desc", "type": "text",
-"text": "Como a situação econômica geral (juros, inflação, demanda) tem impactado a empresa?"},
-{"id": "condicoes_economia_nota", "type": "scale",
-"text": "De 0 a 10, quão confortável é o cenário econômico atual para assumir crédito?"},
-{"id": "condicoes_operacao_desc", "type": "text",
-"text": "Qual seria a finalidade principal do crédito (capital de giro, investimento, alongamento de dívida etc.)?"},
-{"id": "condicoes_operacao_nota", "type": "scale",
-"text": "De 0 a 10, quão coerente você considera a tomada de crédito com a realidade atual da empresa?"},
-],
-"Conglomerado": [
-{"id": "conglomerado_grupo_desc", "type": "text",
-"text": "A empresa faz parte de um grupo econômico? Descreva rapidamente as empresas relacionadas e relações entre elas."},
-{"id": "conglomerado_grupo_nota", "type": "scale",
-"text": "De 0 a 10, quanto você considera que o grupo econômico fortalece a empresa (em vez de enfraquecer)?"},
-{"id": "conglomerado_socios_desc", "type": "text",
-"text": "Descreva o perfil dos sócios e da gestão (experiência, envolvimento no dia a dia, alinhamento)."},
-{"id": "conglomerado_socios_nota", "type": "scale",
-"text": "De 0 a 10, qual nota você daria para a qualidade da gestão e dos sócios da empresa?"},
-{"id": "conglomerado_controles_desc", "type": "text",
-"text": "A empresa possui controles internos, contabilidade organizada, relatórios financeiros e acompanhamento de indicadores? Descreva."},
-{"id": "conglomerado_controles_nota", "type": "scale",
-"text": "De 0 a 10, quão estruturada você considera a governança e os controles da empresa?"},
-]
+    "Caráter": [
+        {"id": "caracter_hist_atrasos_desc", "type": "text",
+         "text": "Descreva, com sinceridade, o histórico da empresa em relação a atrasos com bancos, fornecedores e impostos nos últimos 24 meses."},
+        {"id": "caracter_hist_atrasos_nota", "type": "scale",
+         "text": "De 0 a 10, qual nota você daria para o cumprimento de prazos de pagamento da empresa? (0 = péssimo, 10 = sempre em dia)"},
+        {"id": "caracter_restricoes_desc", "type": "text",
+         "text": "Existem protestos, apontamentos em Serasa/Cartórios ou restrições em nome da empresa ou dos sócios? Descreva."},
+        {"id": "caracter_restricoes_nota", "type": "scale",
+         "text": "De 0 a 10, quão limpa você considera a situação cadastral da empresa e dos sócios? (0 = muito suja, 10 = totalmente limpa)"},
+        {"id": "caracter_reputacao_desc", "type": "text",
+         "text": "Como você descreveria a reputação da empresa junto a fornecedores, clientes e parceiros?"},
+        {"id": "caracter_reputacao_nota", "type": "scale",
+         "text": "De 0 a 10, qual nota você daria para a reputação da empresa no mercado?"},
+    ],
+    "Capacidade": [
+        {"id": "capacidade_fluxo_desc", "type": "text",
+         "text": "Descreva como está hoje o fluxo de caixa da empresa (entradas, saídas, aperto em determinados períodos etc.)."},
+        {"id": "capacidade_fluxo_nota", "type": "scale",
+         "text": "De 0 a 10, qual nota você daria para a capacidade atual da empresa de gerar caixa para pagar dívidas?"},
+        {"id": "capacidade_faturamento_desc", "type": "text",
+         "text": "Explique como está o faturamento dos últimos 12 meses (crescendo, caindo, estável)."},
+        {"id": "capacidade_faturamento_nota", "type": "scale",
+         "text": "De 0 a 10, quão confortável você está com o nível atual de faturamento para suportar novas dívidas?"},
+        {"id": "capacidade_endividamento_desc", "type": "text",
+         "text": "Descreva o nível de endividamento atual (bancos, factorings, fornecedores, impostos)."},
+        {"id": "capacidade_endividamento_nota", "type": "scale",
+         "text": "De 0 a 10, considerando tudo, qual nota você daria para a capacidade da empresa de assumir mais crédito sem se complicar?"},
+    ],
+    "Capital": [
+        {"id": "capital_estrutura_desc", "type": "text",
+         "text": "Descreva a estrutura financeira da empresa: possui reservas, capital próprio, patrimônio, bens em nome da empresa?"},
+        {"id": "capital_reservas_nota", "type": "scale",
+         "text": "De 0 a 10, qual nota você daria para o nível de reserva financeira e capital próprio da empresa?"},
+        {"id": "capital_patrimonio_desc", "type": "text",
+         "text": "Quais são os principais bens e ativos relevantes em nome da empresa (imóveis, máquinas, veículos etc.)?"},
+        {"id": "capital_patrimonio_nota", "type": "scale",
+         "text": "De 0 a 10, quão robusto você considera o patrimônio da empresa em relação ao tamanho do negócio?"},
+        {"id": "capital_resiliencia_desc", "type": "text",
+         "text": "Como a empresa costuma reagir a crises (perda de clientes, queda de faturamento, aumento de custo)?"},
+        {"id": "capital_resiliencia_nota", "type": "scale",
+         "text": "De 0 a 10, qual a capacidade da empresa de suportar períodos difíceis sem deixar de pagar suas obrigações?"},
+    ],
+    "Colateral": [
+        {"id": "colateral_bens_desc", "type": "text",
+         "text": "Que garantias a empresa poderia oferecer em uma operação de crédito (imóveis, veículos, máquinas, recebíveis)?"},
+        {"id": "colateral_bens_nota", "type": "scale",
+         "text": "De 0 a 10, quão fortes e líquidos você considera esses bens como garantia?"},
+        {"id": "colateral_recebiveis_desc", "type": "text",
+         "text": "A empresa possui carteira de recebíveis (duplicatas, boletos, cartões, contratos) que poderia ser usada como garantia? Descreva."},
+        {"id": "colateral_recebiveis_nota", "type": "scale",
+         "text": "De 0 a 10, qual a qualidade desses recebíveis (prazo, risco de inadimplência, concentração em poucos clientes)?"},
+        {"id": "colateral_avales_desc", "type": "text",
+         "text": "Os sócios estariam dispostos a dar garantias pessoais (aval, fiança) se necessário? Descreva."},
+        {"id": "colateral_avales_nota", "type": "scale",
+         "text": "De 0 a 10, quão confortável você considera a estrutura de garantias que a empresa conseguiria montar hoje?"},
+    ],
+    "Condições": [
+        {"id": "condicoes_setor_desc", "type": "text",
+         "text": "Descreva como está o momento do setor em que a empresa atua (expansão, crise, concorrência forte etc.)."},
+        {"id": "condicoes_setor_nota", "type": "scale",
+         "text": "De 0 a 10, quão favoráveis são as condições do setor para a empresa hoje?"},
+        {"id": "condicoes_economia_desc", "type": "text",
+         "text": "Como a situação econômica geral (juros, inflação, demanda) tem impactado a empresa?"},
+        {"id": "condicoes_economia_nota", "type": "scale",
+         "text": "De 0 a 10, quão confortável é o cenário econômico atual para assumir crédito?"},
+        {"id": "condicoes_operacao_desc", "type": "text",
+         "text": "Qual seria a finalidade principal do crédito (capital de giro, investimento, alongamento de dívida etc.)?"},
+        {"id": "condicoes_operacao_nota", "type": "scale",
+         "text": "De 0 a 10, quão coerente você considera a tomada de crédito com a realidade atual da empresa?"},
+    ],
+    "Conglomerado": [
+        {"id": "conglomerado_grupo_desc", "type": "text",
+         "text": "A empresa faz parte de um grupo econômico? Descreva rapidamente as empresas relacionadas e relações entre elas."},
+        {"id": "conglomerado_grupo_nota", "type": "scale",
+         "text": "De 0 a 10, quanto você considera que o grupo econômico fortalece a empresa (em vez de enfraquecer)?"},
+        {"id": "conglomerado_socios_desc", "type": "text",
+         "text": "Descreva o perfil dos sócios e da gestão (experiência, envolvimento no dia a dia, alinhamento)."},
+        {"id": "conglomerado_socios_nota", "type": "scale",
+         "text": "De 0 a 10, qual nota você daria para a qualidade da gestão e dos sócios da empresa?"},
+        {"id": "conglomerado_controles_desc", "type": "text",
+         "text": "A empresa possui controles internos, contabilidade organizada, relatórios financeiros e acompanhamento de indicadores? Descreva."},
+        {"id": "conglomerado_controles_nota", "type": "scale",
+         "text": "De 0 a 10, quão estruturada você considera a governança e os controles da empresa?"},
+    ]
 }
 
-# =============== HEURÍSTICAS AUXILIARES ===============
-
-POSITIVE_WORDS = [
-"em dia", "pontual", "sem atrasos", "sem atraso", "crescente", "crescendo",
-"estável", "aumentando", "melhorando", "reservas", "lucro", "lucrativo",
-"sem restrição", "sem protesto", "limpo", "organizado", "estruturado",
-"controle", "governança", "bom relacionamento", "boa reputação"
-]
-
-NEGATIVE_WORDS = [
-"atraso", "atrasos", "inadimplência", "inadimplente", "protesto", "protestos",
-"serasa", "restrição", "restrições", "crise", "queda", "caindo", "dificuldade",
-"aperto", "negativo", "prejuízo", "endividado", "endividamento alto",
-"sem reserva", "sem garantia", "desorganizado", "bagunça"
-]
-
-
-def risk_color(percent: float) -> str:
-if percent >= 80:
-return "🟢 Verde (risco baixo)"
-elif 60 <= percent < 80:
-return "🟡 Amarelo (risco moderado)"
-elif 40 <= percent < 60:
-return "🟠 Laranja (risco elevado)"
-else:
-return "🔴 Vermelho (risco crítico)"
+# Ids das perguntas dissertativas por categoria, extraídos uma vez no import:
+# o laço do parecer lê essa tupla direto, sem refiltrar os dicts por tipo.
+_TEXT_IDS = {cat: tuple(q["id"] for q in qs if q["type"] == "text")
+             for cat, qs in QUESTIONS.items()}
 
+# =============== HEURÍSTICAS AUXILIARES ===============
 
-def analyze_text_block(text: str, category: str) -> str:
-t = text.lower()
-pos = sum(t.count(w) for w in POSITIVE_WORDS)
-neg = sum(t.count(w) for w in NEGATIVE_WORDS)
-
-if pos == 0 and neg == 0 and not t.strip():
-return "Não houve informações qualitativas suficientes declaradas nessa dimensão para um diagnóstico mais fino."
-
-if pos > neg:
-base = "As respostas qualitativas indicam tendência mais positiva nessa dimensão, com alguns pontos que jogam a favor da empresa."
-elif neg > pos:
-base = "As respostas qualitativas sugerem presença de fragilidades relevantes nessa dimensão, exigindo atenção redobrada."
-else:
-base = "As respostas qualitativas mostram um cenário misto, com fatores positivos e negativos se equilibrando."
-
-if category == "Caráter":
-complemento = " Em Caráter, isso se traduz em histórico e postura que impactam diretamente a confiança na empresa."
-elif category == "Capacidade":
-complemento = " Em Capacidade, essa leitura afeta diretamente a percepção sobre geração de caixa e capacidade de honrar compromissos."
-elif category == "Capital":
-complemento = " Em Capital, isso reflete o quão preparada a empresa está estruturalmente para suportar choques e imprevistos."
-elif category == "Colateral":
-complemento = " Em Colateral, o foco é a consistência e qualidade das garantias que poderiam mitigar o risco assumido."
-elif category == "Condições":
-complemento = " Em Condições, a leitura recai sobre o ambiente externo e a aderência da tomada de crédito ao momento do negócio."
-else:  # Conglomerado
-complemento = " Em Conglomerado, essa percepção está ligada à força do grupo econômico, gestão e governança."
-
-return base + complemento
-
-
-# =============== EXTRAÇÃO GENÉRICA DE PDF ===============
-
-def extract_pdf_text(file) -> str:
-    text = ""
-    with pdfplumber.open(file) as pdf:
-        for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
-    return text
+POSITIVE_WORDS = (
+    "em dia", "pontual", "sem atrasos", "sem atraso", "crescente", "crescendo",
+    "estável", "aumentando", "melhorando", "reservas", "lucro", "lucrativo",
+    "sem restrição", "sem protesto", "limpo", "organizado", "estruturado",
+    "controle", "governança", "bom relacionamento", "boa reputação"
+)
 
+NEGATIVE_WORDS = (
+    "atraso", "atrasos", "inadimplência", "inadimplente", "protesto", "protestos",
+    "serasa", "restrição", "restrições", "crise", "queda", "caindo", "dificuldade",
+    "aperto", "negativo", "prejuízo", "endividado", "endividamento alto",
+    "sem reserva", "sem garantia", "desorganizado", "bagunça"
+)
 
-def parse_br_number(num_str: str):
-    try:
-        clean = num_str.replace(".", "").replace(",", ".").strip()
-        return float(clean)
-    except Exception:
-        return None
+def _fold(s: str) -> str:
+    """Normaliza para ASCII minúsculo (remove acentos) em uma única passada."""
+    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode("ascii").lower()
 
 
-# =============== ANÁLISE SERASA ===============
+def _build_tagged_automaton(groups):
+    """Autômato Aho-Corasick único para vários grupos de termos.
 
-def analyze_serasa_text(text: str) -> str:
-    tl = text.lower()
+    Cada palavra carrega a etiqueta do grupo; uma passada por _count_groups
+    devolve todos os contadores de uma vez, no lugar de uma varredura do
+    texto por grupo.
+    """
+    automaton = ahocorasick.Automaton()
+    for tag, words in groups.items():
+        for w in words:
+            automaton.add_word(w, (tag, w))
+    automaton.make_automaton()
+    return automaton
+
+
+def _count_groups(automaton, text: str) -> Counter:
+    counts = Counter()
+    for _, (tag, _word) in automaton.iter(text):
+        counts[tag] += 1
+    return counts
+
+
+# Palavras simples são contadas por token (Counter sobre \w+), o que evita
+# contar "atraso" dentro de "atrasos"; só as expressões com espaço precisam
+# da varredura por autômato.
+_WORD_RE = re.compile(r"\w+")
+
+_POS_SINGLE = frozenset(w for w in POSITIVE_WORDS if " " not in w)
+_NEG_SINGLE = frozenset(w for w in NEGATIVE_WORDS if " " not in w)
+
+_KEYWORD_AUTOMATON = _build_tagged_automaton({
+    "pos": [w for w in POSITIVE_WORDS if " " in w],
+    "neg": [w for w in NEGATIVE_WORDS if " " in w],
+})
+
+# Complemento por C do comentário qualitativo (analyze_text_block)
+_COMPLEMENTOS = {
+    "Caráter": " Em Caráter, isso se traduz em histórico e postura que impactam diretamente a confiança na empresa.",
+    "Capacidade": " Em Capacidade, essa leitura afeta diretamente a percepção sobre geração de caixa e capacidade de honrar compromissos.",
+    "Capital": " Em Capital, isso reflete o quão preparada a empresa está estruturalmente para suportar choques e imprevistos.",
+    "Colateral": " Em Colateral, o foco é a consistência e qualidade das garantias que poderiam mitigar o risco assumido.",
+    "Condições": " Em Condições, a leitura recai sobre o ambiente externo e a aderência da tomada de crédito ao momento do negócio.",
+    "Conglomerado": " Em Conglomerado, essa percepção está ligada à força do grupo econômico, gestão e governança.",
+}
 
-    protest_value = None
-    protest_match = re.search(r"protest[oa]s?.{0,80}?r\$\s*([\d\.\,]+)", text, flags=re.IGNORECASE | re.DOTALL)
-    if protest_match:
-        protest_value = parse_br_number(protest_match.group(1))
-
-    frases_bom_fornecedor = [
-        "não foram encontradas pendências comerciais",
-        "não constam pendências comerciais",
-        "sem pendências comerciais",
-        "sem pendências com fornecedores"
-    ]
-    good_suppliers = any(frase in tl for frase in frases_bom_fornecedor)
-    has_supplier_pendencias = "pendências comerciais" in tl or "pendencias comerciais" in tl
+# Recomendação por C usada no parecer (generate_report)
+_RECOMENDACOES = {
+    "Caráter": (
+        "Recomendo reforçar o histórico de pontualidade, regularizar eventuais restrições e manter "
+        "uma postura transparente com credores e fornecedores, pois isso sustenta a confiança no longo prazo."
+    ),
+    "Capacidade": (
+        "É importante aprimorar planejamento de fluxo de caixa, monitorar de perto endividamento e proteger "
+        "a margem operacional, garantindo que novas dívidas sejam suportáveis."
+    ),
+    "Capital": (
+        "Fortalecer capital próprio, patrimônio e reservas aumenta a resiliência da empresa e reduz a "
+        "sensibilidade a choques de mercado ou perda de clientes."
+    ),
+    "Colateral": (
+        "Estruturar garantias mais consistentes – seja em bens de boa liquidez, seja em recebíveis de qualidade – "
+        "melhora substancialmente a atratividade da empresa para operações de crédito."
+    ),
+    "Condições": (
+        "Vale alinhar o uso do crédito ao momento setorial e macroeconômico, priorizando operações que apoiem "
+        "ajuste de estrutura ou crescimento sustentável, e não apenas o fechamento de buracos de curto prazo."
+    ),
+    "Conglomerado": (
+        "Aperfeiçoar governança, clareza nas relações entre empresas do grupo, qualidade da gestão e registros "
+        "contábeis ajuda a reduzir opacidade e transmitir mais segurança a quem concede crédito."
+    ),
+}
 
-    bank_terms = [" banco ", "bancária", "bancario", "instituição financeira", "instituicoes financeiras",
-                  "financeira", "crédito bancário", "operações de crédito", "operacoes de credito"]
-    bank_hits = sum(tl.count(t) for t in bank_terms)
 
-    bank_negative = any(p in tl for p in [
-        "atraso com bancos", "pendência com instituições financeiras",
-        "pendências com instituições financeiras", "crédito bancário em atraso",
-        "em atraso com instituições financeiras"
-    ])
+# Faixas de 20 pontos: 0-39 vermelho, 40-59 laranja, 60-79 amarelo, 80+ verde.
+_RISK_COLORS = (
+    "🔴 Vermelho (risco crítico)",
+    "🔴 Vermelho (risco crítico)",
+    "🟠 Laranja (risco elevado)",
+    "🟡 Amarelo (risco moderado)",
+    "🟢 Verde (risco baixo)",
+)
 
-    tax_terms = ["dívida ativa", "divida ativa", "receita federal", "débito tributário", "debito tributario",
-                 "tributário", "tributario", "inss", "fgts", "icms", "iss", "imposto", "tributos"]
-    tax_hits = sum(tl.count(t) for t in tax_terms)
 
-    if bank_hits == 0:
-        bancos_txt = "O relatório não traz elementos claros sobre endividamento com instituições financeiras; é recomendável validar com DFs e outras fontes."
-    elif bank_negative:
-        bancos_txt = "Há menções a pendências ou atrasos junto a instituições financeiras, indicando endividamento bancário com sinais de estresse."
-    else:
-        bancos_txt = "Existem referências a bancos/financeiras, mas sem evidência forte de atraso; o endividamento bancário parece presente, porém sem sinais claros de deterioração."
-
-    if good_suppliers:
-        fornecedores_txt = "O relatório indica bom histórico de pagamento a fornecedores na praça, sem pendências comerciais relevantes."
-    elif has_supplier_pendencias:
-        fornecedores_txt = "Constam pendências comerciais com fornecedores, o que sugere fragilidade na cadeia de pagamentos com a praça."
-    else:
-        fornecedores_txt = "Não há indicação clara de pendências comerciais com fornecedores; a situação parece neutra ou não detalhada."
+def risk_color(percent: float) -> str:
+    return _RISK_COLORS[min(4, max(0, int(percent) // 20))]
 
-    if tax_hits > 0:
-        impostos_txt = "Há sinais de envolvimento com temas tributários (dívida ativa, Receita Federal ou débitos de impostos), sugerindo passivos fiscais que devem ser considerados na análise."
-    else:
-        impostos_txt = "O relatório não evidencia de forma explícita débitos tributários relevantes, ou essas informações não estão claras no texto extraído."
 
-    if protest_value is not None:
-        if protest_value >= 50000 and good_suppliers:
-            dica_txt = (
-                "Observa-se um valor elevado em protestos, mas com bom histórico de pagamento a fornecedores. "
-                "Essa combinação, na prática de análise de crédito, costuma indicar concentração de atrasos em "
-                "obrigações fiscais ou específicas (como tributos), o que é menos grave do que ruptura direta "
-                "da cadeia de fornecedores, embora ainda exija atenção na modelagem da operação."
-            )
-        elif protest_value >= 50000 and not good_suppliers:
-            dica_txt = (
-                "O valor de protestos é relevante e não há evidência de bom histórico com fornecedores, "
-                "o que aponta para um risco mais sensível de crédito, incluindo possíveis problemas na praça."
-            )
-        else:
-            dica_txt = (
-                "Há registro de protestos, mas em valor que não se mostra excessivamente elevado pelo texto capturado. "
-                "Ainda assim, é prudente cruzar as informações com balanços, DRE e fluxo de caixa projetado."
-            )
+def analyze_text_block(text: str, category: str) -> str:
+    t = text.lower()
+    tokens = Counter(_WORD_RE.findall(t))
+    hits = _count_groups(_KEYWORD_AUTOMATON, t)
+    pos = hits["pos"] + sum(tokens[w] for w in _POS_SINGLE & tokens.keys())
+    neg = hits["neg"] + sum(tokens[w] for w in _NEG_SINGLE & tokens.keys())
+
+    if pos == 0 and neg == 0 and not t.strip():
+        return "Não houve informações qualitativas suficientes declaradas nessa dimensão para um diagnóstico mais fino."
+
+    if pos > neg:
+        base = "As respostas qualitativas indicam tendência mais positiva nessa dimensão, com alguns pontos que jogam a favor da empresa."
+    elif neg > pos:
+        base = "As respostas qualitativas sugerem presença de fragilidades relevantes nessa dimensão, exigindo atenção redobrada."
     else:
-        dica_txt = (
-            "Não foi possível identificar com clareza o valor total de protestos no texto extraído. "
-            "Sugere-se conferir manualmente o quadro específico de protestos do relatório."
-        )
+        base = "As respostas qualitativas mostram um cenário misto, com fatores positivos e negativos se equilibrando."
 
-    resumo = (
-        "Endividamento com bancos: " + bancos_txt + " "
-        "Histórico de pagamento a fornecedores: " + fornecedores_txt + " "
-        "Situação de impostos e tributos: " + impostos_txt + " "
-        + dica_txt
-    )
+    return base + _COMPLEMENTOS.get(category, _COMPLEMENTOS["Conglomerado"])
 
-    return resumo
 
+# =============== ANÁLISE SISBACEN / SCR ===============
 
-def serasa_section():
-    st.subheader("Análise de Relatório Serasa (PDF) – opcional")
+# Os termos abaixo já estão em ASCII minúsculo: o texto extraído passa por
+# _fold() antes da varredura, o que dispensa as variantes com/sem acento
+# que antes eram mantidas à mão.
 
-    if "serasa_resumo" not in st.session_state:
-        st.session_state["serasa_resumo"] = None
+# Sinais de exposição relevante
+_TERMOS_EXPOSICAO = (
+    "exposicao total", "saldo devedor", "limite contratado",
+    "valor total das operacoes", "operacoes de credito", "risco total"
+)
 
-    uploaded = st.file_uploader("Envie o relatório Serasa (PDF):", type=["pdf"], key="serasa_pdf")
+# Sinais de atraso / classificação de risco ruim
+_TERMOS_ATRASO = (
+    "em atraso", "vencida", "vencidas", "vencidos", "inadimplencia", "inadimplente",
+    "atraso superior", "faixa de atraso", "dias de atraso"
+)
 
-    if uploaded is not None:
-        if st.button("Analisar relatório Serasa"):
-            try:
-                text = extract_pdf_text(uploaded)
-                resumo = analyze_serasa_text(text)
-                st.session_state["serasa_resumo"] = resumo
-                st.success("Relatório Serasa analisado com sucesso.")
-            except Exception as e:
-                st.error(f"Não foi possível ler o PDF do Serasa. Detalhe técnico: {e}")
+# Classificações de risco típicas (AA, A, B, C, D, E, F, G, H)
+_CLASSES_RUINS = ("risco e", "risco f", "risco g", "risco h",
+                  "classificacao e", "classificacao f", "classificacao g", "classificacao h")
 
-    if st.session_state["serasa_resumo"]:
-        st.markdown("### Resumo da análise do Serasa")
-        st.write(st.session_state["serasa_resumo"])
+# Operações baixadas a prejuízo
+_TERMOS_PREJUIZO = (
+    "baixa a prejuizo", "baixada para prejuizo", "operacoes baixadas como prejuizo"
+)
 
-    return st.session_state["serasa_resumo"]
+# Valor de exposição total (sobre o texto já passado por _fold); a janela
+# [^\n]{0,80} não cruza linhas, evitando backtracking quadrático quando o
+# termo aparece sem valor por perto.
+_EXP_RE = re.compile(r"(exposicao total|risco total|valor total das operacoes)[^\n]{0,80}?r\$\s*([\d\.,]+)",
+                     re.IGNORECASE)
 
+_SISBACEN_AUTOMATON = _build_tagged_automaton({
+    "exposicao": _TERMOS_EXPOSICAO,
+    "atraso": _TERMOS_ATRASO,
+    "classes_ruins": _CLASSES_RUINS,
+    "prejuizo": _TERMOS_PREJUIZO,
+})
 
-# =============== ANÁLISE SISBACEN / SCR ===============
 
 def analyze_sisbacen_text(text: str) -> str:
     """
@@ -297,42 +284,23 @@ def analyze_sisbacen_text(text: str) -> str:
     - Operações baixadas a prejuízo
     - Humaniza o parecer bancário
     """
-    tl = text.lower()
-
-    # Sinais de exposição relevante
-    termos_exposicao = [
-        "exposição total", "exposicao total", "saldo devedor", "limite contratado",
-        "valor total das operações", "operações de crédito", "operacoes de credito",
-        "risco total"
-    ]
-    exp_hits = sum(tl.count(t) for t in termos_exposicao)
-
-    # Sinais de atraso / classificação de risco ruim
-    termos_atraso = [
-        "em atraso", "vencida", "vencidas", "vencidos", "inadimplência", "inadimplente",
-        "atraso superior", "faixa de atraso", "dias de atraso"
-    ]
-    atraso_hits = sum(tl.count(t) for t in termos_atraso)
-
-    # Classificações de risco típicas (AA, A, B, C, D, E, F, G, H)
-    classes_ruins = ["risco e", "risco f", "risco g", "risco h", "classificação e", "classificação f",
-                     "classificacao e", "classificacao f", "classificacao g", "classificacao h"]
-    risco_ruim_hits = sum(tl.count(c) for c in classes_ruins)
-
-    # Operações baixadas a prejuízo
-    termos_prejuizo = [
-        "baixa a prejuízo", "baixa a prejuizo", "baixada para prejuízo", "baixada para prejuizo",
-        "operações baixadas como prejuízo", "operacoes baixadas como prejuizo"
-    ]
-    prejuizo_hits = sum(tl.count(t) for t in termos_prejuizo)
+    tl = _fold(text)
 
     # Tentativa simples de achar algum valor de exposição total
     exp_valor = None
-    exp_match = re.search(r"(exposi[cç][aã]o total|risco total|valor total das opera[cç][õo]es).{0,80}?r\$\s*([\d\.\,]+)",
-                          text, flags=re.IGNORECASE | re.DOTALL)
+    exp_match = _EXP_RE.search(tl)
     if exp_match:
         exp_valor = parse_br_number(exp_match.group(2))
 
+    return _sisbacen_resumo(_count_groups(_SISBACEN_AUTOMATON, tl), exp_valor)
+
+
+def _sisbacen_resumo(hits, exp_valor) -> str:
+    exp_hits = hits["exposicao"]
+    atraso_hits = hits["atraso"]
+    risco_ruim_hits = hits["classes_ruins"]
+    prejuizo_hits = hits["prejuizo"]
+
     # Montagem da análise humanizada
 
     # 1) Exposição bancária
@@ -417,6 +385,26 @@ def analyze_sisbacen_text(text: str) -> str:
     return resumo
 
 
+@st.cache_data(show_spinner=False)
+def analyze_sisbacen_pdf(file_bytes: bytes) -> str:
+    """Extrai e analisa o SCR página a página, sem concatenar o documento.
+
+    Diferente do Serasa, os limiares (atraso_hits > 5) dependem das
+    contagens completas, então todas as páginas são varridas.
+    """
+    hits = Counter()
+    exp_valor = None
+    for page_text in _iter_pdf_pages(file_bytes):
+        folded = _fold(page_text)
+        hits.update(_count_groups(_SISBACEN_AUTOMATON, folded))
+        if exp_valor is None:
+            m = _EXP_RE.search(folded)
+            if m:
+                exp_valor = parse_br_number(m.group(2))
+    return _sisbacen_resumo(hits, exp_valor)
+
+
+@st.fragment
 def sisbacen_section():
     st.subheader("Análise de Relatório SISBACEN / SCR (PDF) – opcional")
 
@@ -428,8 +416,7 @@ def sisbacen_section():
     if uploaded is not None:
         if st.button("Analisar relatório SISBACEN/SCR"):
             try:
-                text = extract_pdf_text(uploaded)
-                resumo = analyze_sisbacen_text(text)
+                resumo = analyze_sisbacen_pdf(uploaded.getvalue())
                 st.session_state["sisbacen_resumo"] = resumo
                 st.success("Relatório SISBACEN/SCR analisado com sucesso.")
             except Exception as e:
@@ -444,8 +431,25 @@ def sisbacen_section():
 
 # =============== PARECER EM PROSA ===============
 
-def generate_report(company_name, all_answers, category_scores, overall_percent,
-                    sazonalidade_resumo=None, serasa_resumo=None):
+def _wrap(paragraph: str, width: int = 100):
+    """Quebra gulosa em até `width` colunas (equivale ao TextWrapper para a
+    prosa deste módulo, sem a máquina de estados por palavra dele)."""
+    out = []
+    line = []
+    n = 0
+    for word in paragraph.split():
+        if line and n + len(word) + len(line) > width:
+            out.append(" ".join(line))
+            line = [word]
+            n = len(word)
+        else:
+            line.append(word)
+            n += len(word)
+    if line:
+        out.append(" ".join(line))
+    return out
+
+
 def generate_report(
     company_name,
     all_answers,
@@ -454,282 +458,339 @@ def generate_report(
     sazonalidade_resumo=None,
     serasa_resumo=None,
     sisbacen_resumo=None,
+    data_analise=None,
 ):
-wrapper = textwrap.TextWrapper(width=100)
-lines = []
-
-lines.append(f"Parecer de Crédito - Empresa: {company_name}")
-lines.append("=" * 100)
-lines.append(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-lines.append(f"Score geral de crédito: {overall_percent:.1f}%")
-lines.append(f"Nível de risco: {risk_color(overall_percent)}")
-lines.append("")
-
-if sazonalidade_resumo:
-lines.append("Resumo de sazonalidade de crédito:")
-lines.append(wrapper.fill(sazonalidade_resumo))
-lines.append("")
-
-if serasa_resumo:
-lines.append("Resumo da análise do relatório Serasa:")
-lines.append(wrapper.fill(serasa_resumo))
-lines.append("")
+    if data_analise is None:
+        data_analise = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    buf = StringIO()
+    w = buf.write
+
+    def w_fill(paragraph):
+        # escreve o parágrafo quebrado direto no buffer, sem montar uma
+        # string intermediária por parágrafo
+        for line in _wrap(paragraph):
+            w(line)
+            w("\n")
+
+    w(f"Parecer de Crédito - Empresa: {company_name}\n")
+    w("=" * 100 + "\n")
+    w(f"Data da análise: {data_analise}\n")
+    w(f"Score geral de crédito: {overall_percent:.1f}%\n")
+    w(f"Nível de risco: {risk_color(overall_percent)}\n")
+    w("\n")
+
+    if sazonalidade_resumo:
+        w("Resumo de sazonalidade de crédito:\n")
+        w_fill(sazonalidade_resumo)
+        w("\n")
+
+    if serasa_resumo:
+        w("Resumo da análise do relatório Serasa:\n")
+        w_fill(serasa_resumo)
+        w("\n")
 
     if sisbacen_resumo:
-        lines.append("Resumo da análise de crédito bancário (SISBACEN / SCR):")
-        lines.append(wrapper.fill(sisbacen_resumo))
-        lines.append("")
-
-if overall_percent >= 80:
-visao_geral = (
-"Na minha avaliação, a empresa apresenta um perfil de crédito globalmente saudável. "
-"Os fundamentos de capacidade de pagamento, organização e estrutura de suporte ao crédito "
-"aparecem bem posicionados, permitindo uma exposição maior com risco relativamente controlado."
-)
-elif overall_percent >= 60:
-visao_geral = (
-"Na minha leitura, a empresa demonstra um perfil de crédito razoável. Há pontos consistentes, "
-"mas também algumas vulnerabilidades que sugerem prudência na definição de limites, prazos e "
-"eventuais garantias. O crédito é possível, mas deve ser estruturado com critério."
-)
-elif overall_percent >= 40:
-visao_geral = (
-"Com base nas respostas fornecidas, o perfil de crédito da empresa apresenta fragilidades "
-"significativas. A concessão de crédito deve ser feita com bastante cautela, em valores menores, "
-"prazos mais curtos e forte amparo em garantias, até que os pontos críticos sejam endereçados."
-)
-else:
-visao_geral = (
-"Pela combinação das informações qualitativas e quantitativas, o perfil atual é de alto risco. "
-"Há elementos que indicam baixa capacidade de suportar novas dívidas sem agravamento da situação "
-"financeira. Minha opinião é que, neste momento, a empresa deveria priorizar reorganização interna "
-"e ajuste de estrutura antes de novas concessões."
-)
+        w("Resumo da análise de crédito bancário (SISBACEN / SCR):\n")
+        w_fill(sisbacen_resumo)
+        w("\n")
+
+    if overall_percent >= 80:
+        visao_geral = (
+            "Na minha avaliação, a empresa apresenta um perfil de crédito globalmente saudável. "
+            "Os fundamentos de capacidade de pagamento, organização e estrutura de suporte ao crédito "
+            "aparecem bem posicionados, permitindo uma exposição maior com risco relativamente controlado."
+        )
+    elif overall_percent >= 60:
+        visao_geral = (
+            "Na minha leitura, a empresa demonstra um perfil de crédito razoável. Há pontos consistentes, "
+            "mas também algumas vulnerabilidades que sugerem prudência na definição de limites, prazos e "
+            "eventuais garantias. O crédito é possível, mas deve ser estruturado com critério."
+        )
+    elif overall_percent >= 40:
+        visao_geral = (
+            "Com base nas respostas fornecidas, o perfil de crédito da empresa apresenta fragilidades "
+            "significativas. A concessão de crédito deve ser feita com bastante cautela, em valores menores, "
+            "prazos mais curtos e forte amparo em garantias, até que os pontos críticos sejam endereçados."
+        )
+    else:
+        visao_geral = (
+            "Pela combinação das informações qualitativas e quantitativas, o perfil atual é de alto risco. "
+            "Há elementos que indicam baixa capacidade de suportar novas dívidas sem agravamento da situação "
+            "financeira. Minha opinião é que, neste momento, a empresa deveria priorizar reorganização interna "
+            "e ajuste de estrutura antes de novas concessões."
+        )
 
-lines.append(wrapper.fill(visao_geral))
-lines.append("")
-lines.append("Resumo por dimensão (6 C’s do crédito):")
-
-for cat, data in category_scores.items():
-lines.append(f"- {cat}: {data['percent']:.1f}% ({risk_color(data['percent'])})")
-
-lines.append("")
-lines.append("Análise qualitativa e opinião por C:")
-
-for cat, questions in QUESTIONS.items():
-lines.append("")
-lines.append(f"--- {cat.upper()} ---")
-
-cat_percent = category_scores[cat]["percent"]
-if cat_percent >= 80:
-base_comment = f"Numérica e comparativamente, {cat} aparece como um ponto forte da empresa."
-elif cat_percent >= 60:
-base_comment = f"Em {cat}, os indicadores mostram um nível aceitável, porém com sinais que merecem acompanhamento."
-elif cat_percent >= 40:
-base_comment = f"Os resultados em {cat} revelam fragilidades relevantes, que podem se refletir em risco adicional na concessão de crédito."
-else:
-base_comment = f"Em {cat}, a pontuação indica um ponto crítico, que tende a pressionar negativamente a decisão de crédito."
-
-lines.append(wrapper.fill(base_comment))
-
-cat_text_block = ""
-for q in questions:
-if q["type"] == "text":
-ans = all_answers.get(q["id"], "")
-if ans:
-cat_text_block += " " + ans
-
-comentario_qualitativo = analyze_text_block(cat_text_block, cat)
-lines.append("")
-lines.append(wrapper.fill(comentario_qualitativo))
-
-if cat == "Caráter":
-recomendacao = (
-"Recomendo reforçar o histórico de pontualidade, regularizar eventuais restrições e manter "
-"uma postura transparente com credores e fornecedores, pois isso sustenta a confiança no longo prazo."
-)
-elif cat == "Capacidade":
-recomendacao = (
-"É importante aprimorar planejamento de fluxo de caixa, monitorar de perto endividamento e proteger "
-"a margem operacional, garantindo que novas dívidas sejam suportáveis."
-)
-elif cat == "Capital":
-recomendacao = (
-"Fortalecer capital próprio, patrimônio e reservas aumenta a resiliência da empresa e reduz a "
-"sensibilidade a choques de mercado ou perda de clientes."
-)
-elif cat == "Colateral":
-recomendacao = (
-"Estruturar garantias mais consistentes – seja em bens de boa liquidez, seja em recebíveis de qualidade – "
-"melhora substancialmente a atratividade da empresa para operações de crédito."
-)
-elif cat == "Condições":
-recomendacao = (
-"Vale alinhar o uso do crédito ao momento setorial e macroeconômico, priorizando operações que apoiem "
-"ajuste de estrutura ou crescimento sustentável, e não apenas o fechamento de buracos de curto prazo."
-)
-else:  # Conglomerado
-recomendacao = (
-"Aperfeiçoar governança, clareza nas relações entre empresas do grupo, qualidade da gestão e registros "
-"contábeis ajuda a reduzir opacidade e transmitir mais segurança a quem concede crédito."
-)
+    w_fill(visao_geral)
+    w("\n")
+    w("Resumo por dimensão (6 C’s do crédito):\n")
+
+    for cat, data in category_scores.items():
+        w(f"- {cat}: {data['percent']:.1f}% ({risk_color(data['percent'])})\n")
+
+    w("\n")
+    w("Análise qualitativa e opinião por C:\n")
+
+    for cat in QUESTIONS:
+        w("\n")
+        w(f"--- {cat.upper()} ---\n")
+
+        cat_percent = category_scores[cat]["percent"]
+        if cat_percent >= 80:
+            base_comment = f"Numérica e comparativamente, {cat} aparece como um ponto forte da empresa."
+        elif cat_percent >= 60:
+            base_comment = f"Em {cat}, os indicadores mostram um nível aceitável, porém com sinais que merecem acompanhamento."
+        elif cat_percent >= 40:
+            base_comment = f"Os resultados em {cat} revelam fragilidades relevantes, que podem se refletir em risco adicional na concessão de crédito."
+        else:
+            base_comment = f"Em {cat}, a pontuação indica um ponto crítico, que tende a pressionar negativamente a decisão de crédito."
 
-lines.append("")
-lines.append("Recomendação nesta dimensão:")
-lines.append(wrapper.fill(recomendacao))
+        w_fill(base_comment)
 
-return "\n".join(lines)
+        cat_text_block = "".join(" " + all_answers[i] for i in _TEXT_IDS[cat] if all_answers.get(i))
+
+        comentario_qualitativo = analyze_text_block(cat_text_block, cat)
+        w("\n")
+        w_fill(comentario_qualitativo)
+
+        recomendacao = _RECOMENDACOES.get(cat, _RECOMENDACOES["Conglomerado"])
+
+        w("\n")
+        w("Recomendação nesta dimensão:\n")
+        w_fill(recomendacao)
+
+    # o "\n".join antigo não deixava quebra após a última linha
+    return buf.getvalue()[:-1]
 
 
 # =============== WORD EM MEMÓRIA (PARA DOWNLOAD) ===============
 
-def generate_word_doc_bytes(company_name, report_text, overall_percent):
-safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', company_name) or "Empresa"
-filename = f"Parecer_Credito_{safe_name}.docx"
+@st.cache_data(show_spinner=False)
+def generate_word_doc_bytes(company_name, report_text, overall_percent, data_analise=None):
+    safe_name = re.sub(r'[^a-zA-Z0-9_-]', '_', company_name) or "Empresa"
+    filename = f"Parecer_Credito_{safe_name}.docx"
+
+    if data_analise is None:
+        data_analise = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+    from docx import Document
 
-doc = Document()
-doc.add_heading("Parecer de Crédito Empresarial", level=1)
-doc.add_paragraph(f"Empresa: {company_name}")
-doc.add_paragraph(f"Score geral de crédito: {overall_percent:.1f}%")
-doc.add_paragraph(f"Nível de risco: {risk_color(overall_percent)}")
-doc.add_paragraph(f"Data da análise: {datetime.now().strftime('%d/%m/%Y %H:%M')}")
-doc.add_paragraph("")
+    doc = Document()
+    doc.add_heading("Parecer de Crédito Empresarial", level=1)
+    doc.add_paragraph(f"Empresa: {company_name}")
+    doc.add_paragraph(f"Score geral de crédito: {overall_percent:.1f}%")
+    doc.add_paragraph(f"Nível de risco: {risk_color(overall_percent)}")
+    doc.add_paragraph(f"Data da análise: {data_analise}")
+    doc.add_paragraph("")
 
-doc.add_heading("Conclusão e opinião da IA", level=2)
+    doc.add_heading("Conclusão e opinião da IA", level=2)
 
-for bloco in report_text.split("\n\n"):
-bloco = bloco.strip()
-if bloco:
-doc.add_paragraph(bloco)
+    for bloco in report_text.split("\n\n"):
+        bloco = bloco.strip()
+        if bloco:
+            doc.add_paragraph(bloco)
 
-bio = BytesIO()
-doc.save(bio)
-bio.seek(0)
-return filename, bio
+    bio = BytesIO()
+    doc.save(bio)
+    # bytes (e não o BytesIO) para o retorno ser picklável pelo st.cache_data
+    return filename, bio.getvalue()
 
 
 # =============== SAZONALIDADE (STREAMLIT) ===============
 
+_NOMES_MESES = ("Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
+                "Jul", "Ago", "Set", "Out", "Nov", "Dez")
+
+# Setores com dinâmica de safra (crédito concedido durante o próprio pico)
+_SETORES_SAFRA = ("agro", "agrícola", "agronegócio", "soja", "safra", "grãos")
+
+# O kernel gaussiano circular (sigma = 2) é circulante: pré-computa-se a
+# curva centrada em janeiro e, por mês-alvo, basta rotacioná-la (np.roll).
+# O máximo é exp(0) = 1 (a distância zero sempre ocorre), então escalar por
+# 100 já entrega o percentual — não há normalização a fazer.
+_SAZ_DIST = np.minimum(np.arange(12), 12 - np.arange(12))
+_SAZ_KERNEL_PCT = np.exp(-(_SAZ_DIST ** 2) / (2 * 2.0 ** 2)) * 100
+
+
 def sazonalidade_section():
-st.subheader("Sazonalidade de crédito")
+    st.subheader("Sazonalidade de crédito")
 
-possui_sazonalidade = st.radio(
-"O negócio possui sazonalidade relevante ao longo do ano?",
-["Não", "Sim"],
-horizontal=True
-)
+    possui_sazonalidade = st.radio(
+        "O negócio possui sazonalidade relevante ao longo do ano?",
+        ["Não", "Sim"],
+        horizontal=True
+    )
 
-if possui_sazonalidade == "Não":
-        st.info("Não há sazonalidade específica nesse setor segundo as informações fornecidas.")
-        return "Não há sazonalidade específica nesse setor segundo as informações fornecidas.", None
+    if possui_sazonalidade == "Não":
         msg = "Não há sazonalidade específica nesse setor segundo as informações fornecidas."
         st.info(msg)
         return msg, None
 
-setor = st.text_input(
-"Informe o setor de atuação da empresa (ex.: fantasias, varejo, agro, serviços etc.):",
-""
-).lower()
+    setor = st.text_input(
+        "Informe o setor de atuação da empresa (ex.: fantasias, varejo, agro, serviços etc.):",
+        ""
+    ).lower()
 
-pico_vendas = st.selectbox(
-"Mês de pico de vendas/demanda:",
-options=list(range(1, 13)),
-format_func=lambda m: ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun", "Jul", "Ago", "Set", "Out", "Nov", "Dez"][m - 1]
-)
+    pico_vendas = st.selectbox(
+        "Mês de pico de vendas/demanda:",
+        options=list(range(1, 13)),
+        format_func=lambda m: _NOMES_MESES[m - 1]
+    )
 
-estrategia_default = 2
-if any(p in setor for p in ["agro", "agrícola", "agronegócio", "soja", "safra", "grãos"]):
-estrategia_default = 2  # durante
-
-st.write("Em relação a esse pico de demanda, quando costuma ser mais adequado conceder crédito?")
-estrategia = st.radio(
-"Janela preferencial de crédito:",
-[
-"Alguns meses antes (preparação / formação de estoque)",
-"Durante o próprio pico (ex.: agro no verão)",
-"Logo depois do pico (pós-safra / pós-temporada)"
-],
-index=estrategia_default - 1
-)
+    estrategia_default = 2
+    if any(p in setor for p in _SETORES_SAFRA):
+        estrategia_default = 2  # durante
+
+    st.write("Em relação a esse pico de demanda, quando costuma ser mais adequado conceder crédito?")
+    estrategia = st.radio(
+        "Janela preferencial de crédito:",
+        [
+            "Alguns meses antes (preparação / formação de estoque)",
+            "Durante o próprio pico (ex.: agro no verão)",
+            "Logo depois do pico (pós-safra / pós-temporada)"
+        ],
+        index=estrategia_default - 1
+    )
 
-if estrategia.startswith("Alguns meses antes"):
-shift = -2
-elif estrategia.startswith("Durante"):
-shift = 0
-else:
-shift = 1
-
-centro_credito = pico_vendas + shift
-if centro_credito < 1:
-centro_credito += 12
-elif centro_credito > 12:
-centro_credito -= 12
-
-meses = list(range(1, 13))
-nomes_meses = ["Jan", "Fev", "Mar", "Abr", "Mai", "Jun",
-"Jul", "Ago", "Set", "Out", "Nov", "Dez"]
-
-sigma = 2.0
-valores_brutos = []
-for m in meses:
-dist_direta = abs(m - centro_credito)
-dist_circular = min(dist_direta, 12 - dist_direta)
-valor = math.exp(-(dist_circular ** 2) / (2 * sigma ** 2))
-valores_brutos.append(valor)
-
-max_valor = max(valores_brutos) if valores_brutos else 1
-valores_percentuais = [(v / max_valor) * 100 for v in valores_brutos]
-
-fig, ax = plt.subplots(figsize=(8, 4))
-ax.plot(meses, valores_percentuais, marker="o")
-ax.set_xticks(meses)
-ax.set_xticklabels(nomes_meses)
-ax.set_ylim(0, 110)
-ax.set_xlabel("Meses do ano")
-ax.set_ylabel("Atratividade de aprovação de crédito (%)")
-ax.set_title("Sazonalidade recomendada de crédito")
-ax.grid(True)
-
-st.pyplot(fig)
-
-if shift == -2:
-janela = "alguns meses ANTES do pico de vendas"
-elif shift == 0:
-janela = "no próprio pico de vendas"
-else:
-janela = "logo DEPOIS do pico de vendas"
-
-nome_mes_pico = nomes_meses[pico_vendas - 1]
-nome_mes_centro = nomes_meses[centro_credito - 1]
-resumo = (
-f"Para o setor informado ({setor if setor else 'não especificado'}), a análise considera que o "
-f"pico de demanda ocorre em {nome_mes_pico}. A janela ótima de crédito foi ajustada para {janela}, "
-f"com maior atratividade concentrada em {nome_mes_centro} e meses próximos."
-)
+    if estrategia.startswith("Alguns meses antes"):
+        shift = -2
+    elif estrategia.startswith("Durante"):
+        shift = 0
+    else:
+        shift = 1
+
+    centro_credito = pico_vendas + shift
+    if centro_credito < 1:
+        centro_credito += 12
+    elif centro_credito > 12:
+        centro_credito -= 12
+
+    valores_percentuais = np.roll(_SAZ_KERNEL_PCT, centro_credito - 1)
+
+    import pandas as pd
+
+    # rótulos com prefixo numérico para o eixo manter a ordem cronológica
+    rotulos = [f"{m:02d}-{nome}" for m, nome in enumerate(_NOMES_MESES, start=1)]
+    st.line_chart(
+        pd.DataFrame({"Atratividade de aprovação de crédito (%)": valores_percentuais}, index=rotulos)
+    )
 
-st.caption(resumo)
-return resumo, fig
+    if shift == -2:
+        janela = "alguns meses ANTES do pico de vendas"
+    elif shift == 0:
+        janela = "no próprio pico de vendas"
+    else:
+        janela = "logo DEPOIS do pico de vendas"
+
+    nome_mes_pico = _NOMES_MESES[pico_vendas - 1]
+    nome_mes_centro = _NOMES_MESES[centro_credito - 1]
+    resumo = (
+        f"Para o setor informado ({setor if setor else 'não especificado'}), a análise considera que o "
+        f"pico de demanda ocorre em {nome_mes_pico}. A janela ótima de crédito foi ajustada para {janela}, "
+        f"com maior atratividade concentrada em {nome_mes_centro} e meses próximos."
+    )
+
+    st.caption(resumo)
+    return resumo, None
 
 
 # =============== SERASA: EXTRAÇÃO E ANÁLISE ===============
 
-def extract_pdf_text(file) -> str:
-    text = ""
-    with pdfplumber.open(file) as pdf:
+def _load_pdfium():
+    # pypdfium2 (núcleo C do PDFium) extrai texto bruto muito mais rápido que
+    # o pdfplumber; este fica como fallback caso a lib não esteja instalada.
+    try:
+        import pypdfium2 as pdfium
+    except ImportError:
+        pdfium = None
+    return pdfium
+
+
+def _iter_pdf_pages(file_bytes: bytes):
+    """Gera o texto de cada página, permitindo interromper a extração cedo."""
+    pdfium = _load_pdfium()
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(file_bytes)
+        try:
+            for page in pdf:
+                yield page.get_textpage().get_text_range() or ""
+        finally:
+            pdf.close()
+        return
+
+    import pdfplumber
+
+    with pdfplumber.open(BytesIO(file_bytes)) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text += page_text + "\n"
-    return text
+            yield page.extract_text() or ""
+
+
+@st.cache_data(show_spinner=False)
+def extract_pdf_text(file_bytes: bytes) -> str:
+    return "".join(page_text + "\n" for page_text in _iter_pdf_pages(file_bytes))
+
+
+# Número BR -> float: remove separador de milhar e troca a vírgula decimal
+# em uma única passada C de str.translate.
+_BR_NUM_TRANS = str.maketrans({".": "", ",": "."})
 
 
 def parse_br_number(num_str: str):
     try:
-        clean = num_str.replace(".", "").replace(",", ".").strip()
-        return float(clean)
-    except Exception:
+        return float(num_str.translate(_BR_NUM_TRANS).strip())
+    except (AttributeError, ValueError):
         return None
 
 
+# Valor total de protestos em dois estágios (sobre o texto já passado por
+# _fold): primeiro as ocorrências do rótulo, depois um R$ que comece a até
+# 80 caracteres dele. Varredura linear, sem backtracking, e a janela volta
+# a poder cruzar quebras de linha como o padrão DOTALL original.
+_PROT_KW_RE = re.compile(r"protest[oa]s?", re.IGNORECASE)
+_PROT_VAL_RE = re.compile(r"r\$\s*([\d\.,]+)", re.IGNORECASE)
+
+
+def _find_protest_value(text: str):
+    for kw in _PROT_KW_RE.finditer(text):
+        # o R$ deve começar a até 80 caracteres do rótulo; o endpos limita a
+        # busca à janela (com folga para o número) em vez de correr até o fim
+        val = _PROT_VAL_RE.search(text, kw.end(), kw.end() + 104)
+        if val is not None and val.start() - kw.end() <= 80:
+            return parse_br_number(val.group(1))
+    return None
+
+# Bom histórico de fornecedores? (termos em ASCII: ver _fold)
+_FRASES_BOM_FORNECEDOR = (
+    "nao foram encontradas pendencias comerciais",
+    "nao constam pendencias comerciais",
+    "sem pendencias comerciais",
+    "sem pendencias com fornecedores"
+)
+
+# Indícios gerais de pendências comerciais
+_FRASES_PENDENCIAS = ("pendencias comerciais",)
+
+# Bancos / financeiras
+_BANK_TERMS = (" banco ", "bancaria", "bancario", "instituicao financeira", "instituicoes financeiras",
+               "financeira", "credito bancario", "operacoes de credito")
+
+_BANK_NEG_TERMS = ("atraso com bancos", "pendencia com instituicoes financeiras",
+                   "pendencias com instituicoes financeiras",
+                   "credito bancario em atraso", "em atraso com instituicoes financeiras")
+
+# Impostos / tributos
+_TAX_TERMS = ("divida ativa", "receita federal", "debito tributario", "tributario",
+              "inss", "fgts", "icms", "iss", "imposto", "tributos")
+
+_SERASA_AUTOMATON = _build_tagged_automaton({
+    "bom_fornecedor": _FRASES_BOM_FORNECEDOR,
+    "pendencias": _FRASES_PENDENCIAS,
+    "bancos": _BANK_TERMS,
+    "bancos_neg": _BANK_NEG_TERMS,
+    "impostos": _TAX_TERMS,
+})
+
+
 def analyze_serasa_text(text: str) -> str:
     """
     Análise heurística simples de relatório Serasa:
@@ -738,39 +799,62 @@ def analyze_serasa_text(text: str) -> str:
     - Situação de impostos (via inferência)
     - Dica: protestos altos + bons fornecedores -> provável peso de impostos
     """
-    tl = text.lower()
+    tl = _fold(text)
 
     # --- Protestos (tentativa de capturar valor total) ---
-    protest_value = None
-    protest_match = re.search(r"protest[oa]s?.{0,80}?r\$\s*([\d\.\,]+)", text, flags=re.IGNORECASE | re.DOTALL)
-    if protest_match:
-        protest_value = parse_br_number(protest_match.group(1))
-
-    # Bom histórico de fornecedores?
-    frases_bom_fornecedor = [
-        "não foram encontradas pendências comerciais",
-        "não constam pendências comerciais",
-        "sem pendências comerciais",
-        "sem pendências com fornecedores"
-    ]
-    good_suppliers = any(frase in tl for frase in frases_bom_fornecedor)
+    protest_value = _find_protest_value(tl)
 
-    # Indícios gerais de pendências comerciais
-    has_supplier_pendencias = "pendências comerciais" in tl or "pendencias comerciais" in tl
+    return _serasa_resumo(_count_groups(_SERASA_AUTOMATON, tl), protest_value)
 
-    # Bancos / financeiras
-    bank_terms = [" banco ", "bancária", "bancario", "instituição financeira", "instituicoes financeiras",
-                  "financeira", "crédito bancário", "operacões de crédito", "operações de crédito"]
-    bank_hits = sum(tl.count(t) for t in bank_terms)
 
-    bank_negative = any(p in tl for p in ["atraso com bancos", "pendência com instituições financeiras",
-                                          "pendências com instituições financeiras",
-                                          "crédito bancário em atraso", "em atraso com instituições financeiras"])
+# Grupos cuja presença fecha o veredito do Serasa (os contadores desta
+# análise só são lidos como zero/não-zero).
+_SERASA_PRESENCE_KEYS = ("bom_fornecedor", "pendencias", "bancos", "bancos_neg", "impostos")
 
-    # Impostos / tributos
-    tax_terms = ["dívida ativa", "divida ativa", "receita federal", "débito tributário", "debito tributario",
-                 "tributário", "tributario", "inss", "fgts", "icms", "iss", "imposto", "tributos"]
-    tax_hits = sum(tl.count(t) for t in tax_terms)
+# Gatilhos que um relatório Serasa extraível traz logo no início; sem nenhum
+# deles na primeira página, o upload não é um Serasa legível e o restante do
+# documento nem precisa ser varrido.
+_SERASA_TRIGGERS = ("serasa", "score", "protest")
+
+
+@st.cache_data(show_spinner=False)
+def analyze_serasa_pdf(file_bytes: bytes) -> str:
+    """Extrai e analisa o Serasa página a página.
+
+    Interrompe a extração assim que o veredito está fechado (valor de
+    protesto capturado e todos os grupos de termos já vistos) — nos
+    relatórios típicos isso acontece nas primeiras páginas.
+    """
+    hits = Counter()
+    protest_value = None
+    triaged = False
+    tail = ""
+    for page_text in _iter_pdf_pages(file_bytes):
+        folded = _fold(page_text)
+        # a triagem olha a primeira página que extrai texto (capas/imagens
+        # vêm vazias): sem nenhum gatilho ali, o upload não é um Serasa e o
+        # veredito "nada encontrado" sai sem varrer o restante do documento
+        if not triaged and folded.strip():
+            triaged = True
+            if not any(t in folded[:4096] for t in _SERASA_TRIGGERS):
+                break
+        hits.update(_count_groups(_SERASA_AUTOMATON, folded))
+        if protest_value is None:
+            # o tail reproduz a junção por "\n" da extração inteira: rótulo
+            # no pé de uma página com o R$ no topo da seguinte ainda casa
+            protest_value = _find_protest_value(tail + "\n" + folded)
+        if protest_value is not None and all(hits[k] for k in _SERASA_PRESENCE_KEYS):
+            break
+        tail = folded[-120:]
+    return _serasa_resumo(hits, protest_value)
+
+
+def _serasa_resumo(hits, protest_value) -> str:
+    good_suppliers = hits["bom_fornecedor"] > 0
+    has_supplier_pendencias = hits["pendencias"] > 0
+    bank_hits = hits["bancos"]
+    bank_negative = hits["bancos_neg"] > 0
+    tax_hits = hits["impostos"]
 
     # --- Montagem da análise ---
 
@@ -832,6 +916,7 @@ def analyze_serasa_text(text: str) -> str:
     return resumo
 
 
+@st.fragment
 def serasa_section():
     st.subheader("Análise de Relatório Serasa (PDF) – opcional")
 
@@ -843,8 +928,7 @@ def serasa_section():
     if uploaded is not None:
         if st.button("Analisar relatório Serasa"):
             try:
-                text = extract_pdf_text(uploaded)
-                resumo = analyze_serasa_text(text)
+                resumo = analyze_serasa_pdf(uploaded.getvalue())
                 st.session_state["serasa_resumo"] = resumo
                 st.success("Relatório Serasa analisado com sucesso.")
             except Exception as e:
@@ -860,81 +944,82 @@ def serasa_section():
 # =============== APP STREAMLIT ===============
 
 def main():
-st.set_page_config(page_title="IA de Crédito Empresarial - BRF", layout="wide")
+    st.set_page_config(page_title="IA de Crédito Empresarial - BRF", layout="wide")
 
-st.title("IA de Diagnóstico de Crédito Empresarial")
-    st.write("Baseada nos 6 C’s do crédito – versão BR Financial com parecer opinativo, sazonalidade e leitura de Serasa (PDF).")
+    st.title("IA de Diagnóstico de Crédito Empresarial")
     st.write("Baseada nos 6 C’s do crédito – versão BR Financial com parecer opinativo, sazonalidade, Serasa e SISBACEN/SCR.")
 
-company_name = st.text_input("Nome da empresa analisada:", "")
+    company_name = st.text_input("Nome da empresa analisada:", "")
 
-all_answers = {}
-category_scores = {}
+    all_answers = {}
+    category_scores = {}
 
-st.header("Questionário – 6 C’s do crédito")
+    st.header("Questionário – 6 C’s do crédito")
 
-for category, questions in QUESTIONS.items():
-with st.expander(category, expanded=False):
-cat_score = 0.0
-cat_max = 0.0
+    for category, questions in QUESTIONS.items():
+        with st.expander(category, expanded=False):
+            cat_score = 0.0
+            cat_max = 0.0
 
-for q in questions:
-if q["type"] == "text":
-ans = st.text_area(q["text"], key=q["id"])
-else:
-ans = st.slider(q["text"], 0.0, 10.0, 5.0, 0.5, key=q["id"])
-cat_score += ans
-cat_max += 10.0
-all_answers[q["id"]] = ans
+            for q in questions:
+                if q["type"] == "text":
+                    ans = st.text_area(q["text"], key=q["id"])
+                else:
+                    ans = st.slider(q["text"], 0.0, 10.0, 5.0, 0.5, key=q["id"])
+                    cat_score += ans
+                    cat_max += 10.0
+                all_answers[q["id"]] = ans
 
-cat_percent = (cat_score / cat_max) * 100 if cat_max > 0 else 0
-category_scores[category] = {
-"score": cat_score,
-"max": cat_max,
-"percent": cat_percent
-}
-st.markdown(f"**Score parcial de {category}: {cat_percent:.1f}% ({risk_color(cat_percent)})**")
+            cat_percent = (cat_score / cat_max) * 100 if cat_max > 0 else 0
+            category_scores[category] = {
+                "score": cat_score,
+                "max": cat_max,
+                "percent": cat_percent
+            }
+            st.markdown(f"**Score parcial de {category}: {cat_percent:.1f}% ({risk_color(cat_percent)})**")
 
-st.markdown("---")
-sazonalidade_resumo, _ = sazonalidade_section()
+    st.markdown("---")
+    sazonalidade_resumo, _ = sazonalidade_section()
 
-st.markdown("---")
-serasa_resumo = serasa_section()
+    st.markdown("---")
+    serasa_section()
 
     st.markdown("---")
-    sisbacen_resumo = sisbacen_section()
-
-st.markdown("---")
-if st.button("Gerar parecer e documento Word"):
-company_name_use = company_name if company_name else "Empresa Não Informada"
-
-total_score = sum(c["score"] for c in category_scores.values())
-total_max = sum(c["max"] for c in category_scores.values())
-overall_percent = (total_score / total_max) * 100 if total_max > 0 else 0
-
-report = generate_report(
-company_name_use,
-all_answers,
-category_scores,
-overall_percent,
-sazonalidade_resumo=sazonalidade_resumo,
-            serasa_resumo=serasa_resumo
-            serasa_resumo=serasa_resumo,
-            sisbacen_resumo=sisbacen_resumo,
-)
+    sisbacen_section()
 
-st.subheader("Parecer de crédito")
-st.text(report)
+    st.markdown("---")
+    if st.button("Gerar parecer e documento Word"):
+        company_name_use = company_name if company_name else "Empresa Não Informada"
+
+        total_score = sum(c["score"] for c in category_scores.values())
+        total_max = sum(c["max"] for c in category_scores.values())
+        overall_percent = (total_score / total_max) * 100 if total_max > 0 else 0
+
+        data_analise = datetime.now().strftime("%d/%m/%Y %H:%M")
+
+        report = generate_report(
+            company_name_use,
+            all_answers,
+            category_scores,
+            overall_percent,
+            sazonalidade_resumo=sazonalidade_resumo,
+            serasa_resumo=st.session_state.get("serasa_resumo"),
+            sisbacen_resumo=st.session_state.get("sisbacen_resumo"),
+            data_analise=data_analise,
+        )
 
-filename, word_bytes = generate_word_doc_bytes(company_name_use, report, overall_percent)
+        st.subheader("Parecer de crédito")
+        st.text(report)
 
-st.download_button(
-label="Baixar parecer em Word",
-data=word_bytes,
-file_name=filename,
-mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-)
+        filename, word_bytes = generate_word_doc_bytes(company_name_use, report, overall_percent, data_analise=data_analise)
+
+        st.download_button(
+            label="Baixar parecer em Word",
+            data=word_bytes,
+            file_name=filename,
+            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
 
 
 if __name__ == "__main__":
-main()
+    main()